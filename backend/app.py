@@ -1,14 +1,37 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from uvicorn.protocols.utils import ClientDisconnected
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from rag_service import RAGService
 from document_service import DocumentService
+from game_session_service import GameSessionService
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import uvicorn
 import os
 from tempfile import NamedTemporaryFile
 
-app = FastAPI()
+room_cleanup_task: Optional[asyncio.Task] = None
+
+async def _clear_idle_rooms_periodically():
+    while True:
+        await asyncio.sleep(GameSessionService.ROOM_CLEANUP_INTERVAL)
+        try:
+            await game_session_service.clear_idle_rooms()
+        except Exception as e:
+            print(f"清理空闲房间时出错: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global room_cleanup_task
+    room_cleanup_task = asyncio.create_task(_clear_idle_rooms_periodically())
+    yield
+    game_session_service.shutdown()
+    room_cleanup_task.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 # 配置CORS
 app.add_middleware(
@@ -27,6 +50,7 @@ app.add_middleware(
 # 初始化服务
 rag_service = RAGService()
 document_service = DocumentService()
+game_session_service = GameSessionService(rag_service)
 
 class DocumentGenerateRequest(BaseModel):
     document_content: str
@@ -35,6 +59,9 @@ class DocumentGenerateRequest(BaseModel):
 class TopicGenerateRequest(BaseModel):
     topic: str
 
+class CreateRoomRequest(BaseModel):
+    topic: str
+
 class Question(BaseModel):
     question: str
     options: List[str]
@@ -118,5 +145,83 @@ async def generate_questions_directly(request: TopicGenerateRequest):
         print(f"生成问题时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=f"生成问题失败: {str(e)}")
 
+@app.post("/api/rooms")
+async def create_room(request: CreateRoomRequest):
+    try:
+        if not request.topic or not request.topic.strip():
+            raise HTTPException(status_code=400, detail="主题不能为空")
+
+        room = await game_session_service.create_room(request.topic)
+        return {
+            "room_id": room.room_id,
+            "topic": room.topic,
+            "question_count": len(room.questions),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"创建房间时出错: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"创建房间失败: {str(e)}")
+
+@app.get("/api/rooms/{room_id}")
+async def get_room(room_id: str):
+    room = game_session_service.get_room(room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail="房间不存在")
+    return {
+        "room_id": room.room_id,
+        "topic": room.topic,
+        "question_count": len(room.questions),
+        "scoreboard": room.scoreboard(),
+    }
+
+@app.websocket("/ws/rooms/{room_id}")
+async def room_websocket(websocket: WebSocket, room_id: str, name: str):
+    await websocket.accept()
+    try:
+        player = game_session_service.join_room(room_id, name, websocket)
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1008)
+        return
+
+    room = game_session_service.get_room(room_id)
+    try:
+        await websocket.send_json({
+            "type": "questions",
+            "questions": room.public_questions(),
+            "question_index": room.progress[player.slot],
+            "score": room.scores[player.slot],
+        })
+        game_session_service.mark_scoreboard_dirty(room)
+
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except (json.JSONDecodeError, KeyError):  # 非 JSON 文本，或二进制消息（没有 text 字段）
+                await websocket.send_json({"type": "error", "detail": "消息不是有效的 JSON"})
+                continue
+            if not isinstance(message, dict) or message.get("type") != "answer":
+                await websocket.send_json({"type": "error", "detail": "未知的消息类型"})
+                continue
+            try:
+                result = game_session_service.submit_answer(
+                    room_id,
+                    player,
+                    message.get("question_index"),
+                    message.get("answer")
+                )
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            await websocket.send_json(result)
+            game_session_service.mark_scoreboard_dirty(room)
+    except (WebSocketDisconnect, ClientDisconnected):
+        print(f"玩家 {name} 已断开房间 {room_id}")
+    finally:
+        if player.connection is websocket:
+            game_session_service.leave_room(room_id, player)
+            game_session_service.mark_scoreboard_dirty(room)
+
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=5001, reload=True) 
\ No newline at end of file
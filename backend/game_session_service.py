@@ -0,0 +1,244 @@
+from array import array
+from typing import List, Dict, Optional
+import asyncio
+import json
+import time
+import uuid
+
+
+class PlayerRecord:
+    """房间内的玩家记录，分数和进度保存在房间的数组中"""
+    __slots__ = ("name", "slot", "connection")
+
+    def __init__(self, name: str, slot: int, connection=None):
+        self.name = name
+        self.slot = slot  # 在房间计分数组中的下标
+        self.connection = connection  # 当前的 WebSocket 连接，断开时为 None
+
+
+class GameRoom:
+    """游戏房间：共享一套题目，分数和答题进度使用数组存储"""
+    __slots__ = (
+        "room_id", "topic", "questions", "players", "scores", "progress",
+        "last_active", "scoreboard_dirty", "flush_task",
+    )
+
+    def __init__(self, room_id: str, topic: str, questions: List[Dict]):
+        self.room_id = room_id
+        self.topic = topic
+        self.questions = tuple(questions)
+        self.players: Dict[str, PlayerRecord] = {}
+        self.scores = array("I")  # 每个玩家的得分，按 slot 索引
+        self.progress = array("H")  # 每个玩家下一道要回答的题目下标
+        self.last_active = time.monotonic()
+        self.scoreboard_dirty = False  # 计分板有变化，等待推送
+        self.flush_task: Optional[asyncio.Task] = None  # 负责推送计分板的任务
+
+    def touch(self) -> None:
+        """刷新房间活跃时间"""
+        self.last_active = time.monotonic()
+
+    def connections(self) -> List:
+        """获取房间内所有在线连接"""
+        return [p.connection for p in self.players.values() if p.connection is not None]
+
+    def public_questions(self) -> List[Dict]:
+        """返回不包含答案和解释的题目，答案由服务端判定"""
+        return [
+            {"question": q["question"], "options": q["options"]}
+            for q in self.questions
+        ]
+
+    def scoreboard(self) -> List[Dict]:
+        """按分数从高到低返回计分板"""
+        board = [
+            {
+                "name": p.name,
+                "score": self.scores[p.slot],
+                "answered": self.progress[p.slot],
+                "connected": p.connection is not None,
+            }
+            for p in self.players.values()
+        ]
+        board.sort(key=lambda item: item["score"], reverse=True)
+        return board
+
+
+class GameSessionService:
+    MAX_PLAYERS_PER_ROOM = 100
+    ROOM_IDLE_TIMEOUT = 30 * 60  # 无在线玩家的房间空闲过期时间（秒）
+    ROOM_CONNECTED_IDLE_TIMEOUT = 2 * 60 * 60  # 仍有在线玩家的房间空闲过期时间（秒）
+    ROOM_CLEANUP_INTERVAL = 60  # 空闲房间清理间隔（秒）
+    SCOREBOARD_FLUSH_INTERVAL = 0.5  # 计分板合并推送间隔（秒）
+    SEND_TIMEOUT = 5  # 单个连接发送超时（秒）
+
+    def __init__(self, rag_service):
+        self.rag_service = rag_service
+        self._rooms: Dict[str, GameRoom] = {}
+        self._shutting_down = False
+
+    async def create_room(self, topic: str) -> GameRoom:
+        """创建房间，题目只在创建时生成一次，由所有玩家共享"""
+        if not topic or not topic.strip():
+            raise ValueError("主题不能为空")
+
+        # 问题生成是阻塞调用，放到线程池中执行，避免阻塞 WebSocket 事件循环
+        loop = asyncio.get_running_loop()
+        # 生成失败时直接抛出异常，避免整个房间共享默认示例问题
+        questions = await loop.run_in_executor(
+            None, lambda: self.rag_service.generate_questions_directly(topic, raise_on_failure=True)
+        )
+        if not questions:
+            raise ValueError("问题生成失败")
+
+        room_id = uuid.uuid4().hex[:8]
+        room = GameRoom(room_id, topic, questions)
+        self._rooms[room_id] = room
+        print(f"房间 {room_id} 已创建，主题: {topic}，共 {len(room.questions)} 个问题")
+        return room
+
+    def get_room(self, room_id: str) -> Optional[GameRoom]:
+        """获取房间"""
+        return self._rooms.get(room_id)
+
+    def join_room(self, room_id: str, name: str, connection) -> PlayerRecord:
+        """加入房间，同名玩家断线后可以重新连接并保留分数"""
+        room = self._rooms.get(room_id)
+        if room is None:
+            raise ValueError(f"房间不存在: {room_id}")
+        if not name or not name.strip():
+            raise ValueError("玩家名称不能为空")
+
+        player = room.players.get(name)
+        if player is not None:
+            if player.connection is not None:
+                raise ValueError(f"玩家名称已被使用: {name}")
+            player.connection = connection
+        else:
+            if len(room.players) >= self.MAX_PLAYERS_PER_ROOM:
+                raise ValueError("房间人数已满")
+            player = PlayerRecord(name, len(room.scores), connection)
+            room.scores.append(0)
+            room.progress.append(0)
+            room.players[name] = player
+
+        room.touch()
+        return player
+
+    def leave_room(self, room_id: str, player: PlayerRecord) -> None:
+        """玩家断开连接，保留其分数"""
+        player.connection = None
+        room = self._rooms.get(room_id)
+        if room is not None:
+            room.touch()
+
+    def submit_answer(self, room_id: str, player: PlayerRecord, question_index: int, answer: str) -> Dict:
+        """提交答案并返回判定结果"""
+        room = self._rooms.get(room_id)
+        if room is None:
+            raise ValueError(f"房间不存在: {room_id}")
+
+        # 排除 float 和 bool 等非整数下标
+        if type(question_index) is not int:
+            raise ValueError("题目下标必须是整数")
+        if not isinstance(answer, str):
+            raise ValueError("答案必须是字符串")
+
+        # 每位玩家按顺序答题，每道题只能回答一次
+        if question_index != room.progress[player.slot]:
+            raise ValueError("题目下标无效或已回答")
+        if question_index >= len(room.questions):
+            raise ValueError("所有问题已回答完毕")
+
+        question = room.questions[question_index]
+        correct = answer == question["correct_answer"]
+        if correct:
+            room.scores[player.slot] += 1
+        room.progress[player.slot] += 1
+        room.touch()
+
+        return {
+            "type": "result",
+            "question_index": question_index,
+            "correct": correct,
+            "correct_answer": question["correct_answer"],
+            "explanation": question["explanation"],
+            "score": room.scores[player.slot],
+            "finished": room.progress[player.slot] >= len(room.questions),
+        }
+
+    def mark_scoreboard_dirty(self, room: GameRoom) -> None:
+        """标记计分板有变化，由每个房间唯一的推送任务合并后统一推送"""
+        # 服务关闭后或房间已被清理时不再创建推送任务
+        if self._shutting_down or self._rooms.get(room.room_id) is not room:
+            return
+        room.scoreboard_dirty = True
+        if room.flush_task is None or room.flush_task.done():
+            room.flush_task = asyncio.create_task(self._flush_scoreboard(room))
+
+    async def _flush_scoreboard(self, room: GameRoom) -> None:
+        """在间隔内合并多次变化，只构建和推送一次计分板"""
+        while room.scoreboard_dirty:
+            await asyncio.sleep(self.SCOREBOARD_FLUSH_INTERVAL)
+            room.scoreboard_dirty = False
+            await self.broadcast(room, {"type": "scoreboard", "scoreboard": room.scoreboard()})
+
+    async def broadcast(self, room: GameRoom, message: Dict) -> None:
+        """向房间内所有在线玩家广播消息，消息只序列化一次，发送超时的连接会被断开"""
+        players = [p for p in room.players.values() if p.connection is not None]
+        if not players:
+            return
+        text = json.dumps(message, ensure_ascii=False)
+        results = await asyncio.gather(
+            *(
+                asyncio.wait_for(p.connection.send_text(text), self.SEND_TIMEOUT)
+                for p in players
+            ),
+            return_exceptions=True
+        )
+        for player, result in zip(players, results):
+            if isinstance(result, asyncio.TimeoutError):
+                # 慢连接不再参与后续广播，避免拖慢整个房间
+                print(f"玩家 {player.name} 发送超时，断开连接")
+                connection = player.connection
+                player.connection = None
+                room.scoreboard_dirty = True
+                await self._close_connection(connection, code=1008)
+            elif isinstance(result, Exception):
+                print(f"广播消息时出错: {repr(result)}")
+
+    async def _close_connection(self, connection, code: int) -> None:
+        """关闭连接，忽略已断开或超时的连接"""
+        try:
+            await asyncio.wait_for(connection.close(code=code), self.SEND_TIMEOUT)
+        except Exception as e:
+            print(f"关闭连接时出错: {repr(e)}")
+
+    async def clear_idle_rooms(self) -> int:
+        """清理空闲过期的房间，并关闭其中残留的连接"""
+        now = time.monotonic()
+        expired_ids = []
+        for room_id, room in self._rooms.items():
+            timeout = self.ROOM_CONNECTED_IDLE_TIMEOUT if room.connections() else self.ROOM_IDLE_TIMEOUT
+            if now - room.last_active > timeout:
+                expired_ids.append(room_id)
+
+        for room_id in expired_ids:
+            room = self._rooms.pop(room_id)
+            if room.flush_task is not None:
+                room.flush_task.cancel()
+            for player in room.players.values():
+                connection = player.connection
+                if connection is not None:
+                    player.connection = None
+                    await self._close_connection(connection, code=1001)
+        if expired_ids:
+            print(f"已清理 {len(expired_ids)} 个空闲房间")
+        return len(expired_ids)
+
+    def shutdown(self) -> None:
+        """停止创建新的推送任务，并取消所有计分板推送任务"""
+        self._shutting_down = True
+        for room in self._rooms.values():
+            if room.flush_task is not None:
+                room.flush_task.cancel()
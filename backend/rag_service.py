@@ -266,8 +266,8 @@ class RAGService:
         # 合并文本块
         return "\n".join(doc.page_content for doc in docs)
 
-    def _generate_questions_from_context(self, context: str, is_document: bool = True) -> List[Dict]:
-        """从上下文中生成问题"""
+    def _generate_questions_from_context(self, context: str, is_document: bool = True, raise_on_failure: bool = False) -> List[Dict]:
+        """从上下文中生成问题，raise_on_failure 为 True 时生成失败直接抛出异常，不返回默认问题"""
         try:
             # 选择适当的模板
             # 拼接prompt，直接傳字串給llm.invoke
@@ -304,6 +304,8 @@ class RAGService:
         except Exception as e:
             print(f"生成问题时出错: {str(e)}")
             print(f"上下文內容為: {context}")
+            if raise_on_failure:
+                raise
             return [self._get_default_question()]
 
 
@@ -325,18 +327,20 @@ class RAGService:
             print(f"生成问题时出错: {str(e)}")
             return [self._get_default_question()]
 
-    def generate_questions_directly(self, topic: str) -> List[Dict]:
-        """直接从主题生成问题"""
+    def generate_questions_directly(self, topic: str, raise_on_failure: bool = False) -> List[Dict]:
+        """直接从主题生成问题，raise_on_failure 为 True 时生成失败直接抛出异常"""
         try:
             print(f"收到生成问题请求，主题: {topic}")
             if not topic or not topic.strip():
                 raise ValueError("主题不能为空")
             
             # 使用主题作为上下文直接生成问题
-            return self._generate_questions_from_context(topic, is_document=False)
+            return self._generate_questions_from_context(topic, is_document=False, raise_on_failure=raise_on_failure)
             
         except Exception as e:
             print(f"生成问题时出错: {str(e)}")
+            if raise_on_failure:
+                raise
             return [self._get_default_question()]
     
     def _get_default_question(self) -> Dict:
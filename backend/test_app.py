@@ -0,0 +1,92 @@
+import sys
+import types
+import unittest
+
+# RAGService 和 DocumentService 在初始化时会连接 Ollama 和 ChromaDB，测试中替换为桩模块
+rag_service_module = types.ModuleType("rag_service")
+document_service_module = types.ModuleType("document_service")
+
+
+class StubRAGService:
+    fail = False
+
+    def generate_questions_directly(self, topic, raise_on_failure=False):
+        if self.fail and raise_on_failure:
+            raise RuntimeError("LLM 不可用")
+        return [
+            {"question": f"问题 {i}", "options": ["A", "B", "C", "D"], "correct_answer": "A", "explanation": "解释"}
+            for i in range(2)
+        ]
+
+
+class StubDocumentService:
+    pass
+
+
+rag_service_module.RAGService = StubRAGService
+document_service_module.DocumentService = StubDocumentService
+sys.modules.setdefault("rag_service", rag_service_module)
+sys.modules.setdefault("document_service", document_service_module)
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+
+
+class RoomWebSocketTest(unittest.TestCase):
+    def setUp(self):
+        app_module.rag_service.fail = False
+        app_module.game_session_service.SCOREBOARD_FLUSH_INTERVAL = 0.01
+        self.client = TestClient(app_module.app)
+        self.client.__enter__()
+        response = self.client.post("/api/rooms", json={"topic": "历史"})
+        self.assertEqual(response.status_code, 200)
+        self.room_id = response.json()["room_id"]
+
+    def tearDown(self):
+        self.client.__exit__(None, None, None)
+        app_module.game_session_service._shutting_down = False
+
+    def test_generation_failure_returns_500(self):
+        app_module.rag_service.fail = True
+        response = self.client.post("/api/rooms", json={"topic": "历史"})
+        self.assertEqual(response.status_code, 500)
+
+    def test_missing_room_error_detail(self):
+        with self.client.websocket_connect("/ws/rooms/missing?name=alice") as websocket:
+            self.assertEqual(websocket.receive_json(), {"type": "error", "detail": "房间不存在: missing"})
+
+    def test_answer_flow_and_bad_input(self):
+        with self.client.websocket_connect(f"/ws/rooms/{self.room_id}?name=alice") as websocket:
+            questions = websocket.receive_json()
+            self.assertEqual(questions["type"], "questions")
+            self.assertNotIn("correct_answer", questions["questions"][0])
+
+            # 错误输入只返回错误消息，不会断开连接
+            for bad in ["not json", "[1, 2]", '"answer"', '{"type": "answer", "question_index": 0.0, "answer": "A"}']:
+                websocket.send_text(bad)
+                message = websocket.receive_json()
+                while message["type"] == "scoreboard":
+                    message = websocket.receive_json()
+                self.assertEqual(message["type"], "error")
+
+            websocket.send_json({"type": "answer", "question_index": 0, "answer": "A"})
+            message = websocket.receive_json()
+            while message["type"] == "scoreboard":
+                message = websocket.receive_json()
+            self.assertTrue(message["correct"])
+
+            message = websocket.receive_json()
+            while message["scoreboard"][0]["score"] != 1:
+                message = websocket.receive_json()
+            self.assertEqual(message["scoreboard"][0]["name"], "alice")
+
+    def test_lifespan_cancels_background_tasks(self):
+        self.client.__exit__(None, None, None)
+        self.assertTrue(app_module.room_cleanup_task.done())
+        self.assertTrue(app_module.game_session_service._shutting_down)
+        self.client.__enter__()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import unittest
+
+from game_session_service import GameSessionService
+
+QUESTIONS = [
+    {"question": f"问题 {i}", "options": ["A", "B", "C", "D"], "correct_answer": "A", "explanation": "解释"}
+    for i in range(3)
+]
+
+
+class StubRAGService:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def generate_questions_directly(self, topic, raise_on_failure=False):
+        self.calls += 1
+        if self.fail:
+            if raise_on_failure:
+                raise RuntimeError("LLM 不可用")
+            return [{"question": "这是一个示例问题", "options": ["选项A"], "correct_answer": "选项A", "explanation": ""}]
+        return QUESTIONS
+
+
+class StubConnection:
+    def __init__(self, send_delay=0):
+        self.send_delay = send_delay
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+class GameSessionServiceTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.rag_service = StubRAGService()
+        self.service = GameSessionService(self.rag_service)
+        self.room = await self.service.create_room("历史")
+
+    async def asyncTearDown(self):
+        self.service.shutdown()
+
+    async def test_questions_generated_once_per_room(self):
+        for i in range(5):
+            self.service.join_room(self.room.room_id, f"玩家{i}", StubConnection())
+        self.assertEqual(self.rag_service.calls, 1)
+
+    async def test_generation_failure_rejected(self):
+        service = GameSessionService(StubRAGService(fail=True))
+        with self.assertRaises(RuntimeError):
+            await service.create_room("历史")
+        self.assertEqual(service._rooms, {})
+
+    async def test_rejoin_keeps_score(self):
+        player = self.service.join_room(self.room.room_id, "alice", StubConnection())
+        self.service.submit_answer(self.room.room_id, player, 0, "A")
+        self.service.leave_room(self.room.room_id, player)
+
+        rejoined = self.service.join_room(self.room.room_id, "alice", StubConnection())
+        self.assertIs(rejoined, player)
+        self.assertEqual(self.room.scores[rejoined.slot], 1)
+        self.assertEqual(self.room.progress[rejoined.slot], 1)
+
+    async def test_missing_room_rejected(self):
+        with self.assertRaises(ValueError) as cm:
+            self.service.join_room("missing", "alice", StubConnection())
+        self.assertEqual(str(cm.exception), "房间不存在: missing")
+
+    async def test_duplicate_name_rejected(self):
+        self.service.join_room(self.room.room_id, "alice", StubConnection())
+        with self.assertRaises(ValueError):
+            self.service.join_room(self.room.room_id, "alice", StubConnection())
+
+    async def test_out_of_order_and_repeated_answers_rejected(self):
+        player = self.service.join_room(self.room.room_id, "alice", StubConnection())
+        with self.assertRaises(ValueError):
+            self.service.submit_answer(self.room.room_id, player, 1, "A")
+
+        result = self.service.submit_answer(self.room.room_id, player, 0, "B")
+        self.assertFalse(result["correct"])
+        with self.assertRaises(ValueError):
+            self.service.submit_answer(self.room.room_id, player, 0, "A")
+        self.assertEqual(self.room.scores[player.slot], 0)
+
+    async def test_invalid_answer_types_rejected(self):
+        player = self.service.join_room(self.room.room_id, "alice", StubConnection())
+        for question_index, answer in [(0.0, "A"), (False, "A"), (None, "A"), ("0", "A"), (0, ["A"])]:
+            with self.assertRaises(ValueError):
+                self.service.submit_answer(self.room.room_id, player, question_index, answer)
+        self.assertEqual(self.room.progress[player.slot], 0)
+
+    async def test_finished_after_last_question(self):
+        player = self.service.join_room(self.room.room_id, "alice", StubConnection())
+        for i in range(len(QUESTIONS)):
+            result = self.service.submit_answer(self.room.room_id, player, i, "A")
+        self.assertTrue(result["finished"])
+        self.assertEqual(result["score"], len(QUESTIONS))
+        with self.assertRaises(ValueError):
+            self.service.submit_answer(self.room.room_id, player, len(QUESTIONS), "A")
+
+    async def test_max_players_per_room(self):
+        for i in range(self.service.MAX_PLAYERS_PER_ROOM):
+            self.service.join_room(self.room.room_id, f"玩家{i}", StubConnection())
+        with self.assertRaises(ValueError):
+            self.service.join_room(self.room.room_id, "多余的玩家", StubConnection())
+
+    async def test_idle_room_evicted(self):
+        connection = StubConnection()
+        player = self.service.join_room(self.room.room_id, "alice", connection)
+
+        # 有在线玩家的房间使用更长的空闲时限
+        self.room.last_active -= self.service.ROOM_IDLE_TIMEOUT + 1
+        self.assertEqual(await self.service.clear_idle_rooms(), 0)
+        self.assertIsNotNone(self.service.get_room(self.room.room_id))
+
+        self.room.last_active -= self.service.ROOM_CONNECTED_IDLE_TIMEOUT
+        self.assertEqual(await self.service.clear_idle_rooms(), 1)
+        self.assertIsNone(self.service.get_room(self.room.room_id))
+        self.assertEqual(connection.closed_with, 1001)
+        self.assertIsNone(player.connection)
+
+    async def test_abandoned_room_evicted(self):
+        player = self.service.join_room(self.room.room_id, "alice", StubConnection())
+        self.service.mark_scoreboard_dirty(self.room)
+        flush_task = self.room.flush_task
+        self.service.leave_room(self.room.room_id, player)
+
+        self.room.last_active -= self.service.ROOM_IDLE_TIMEOUT + 1
+        self.assertEqual(await self.service.clear_idle_rooms(), 1)
+        await asyncio.sleep(0)
+        self.assertTrue(flush_task.cancelled())
+
+    async def test_scoreboard_updates_coalesced(self):
+        self.service.SCOREBOARD_FLUSH_INTERVAL = 0.01
+        connection = StubConnection()
+        player = self.service.join_room(self.room.room_id, "alice", connection)
+        self.service.mark_scoreboard_dirty(self.room)
+        for i in range(len(QUESTIONS)):
+            self.service.submit_answer(self.room.room_id, player, i, "A")
+            self.service.mark_scoreboard_dirty(self.room)
+
+        await self.room.flush_task
+        self.assertEqual(len(connection.sent), 1)
+        self.assertEqual(connection.sent[0]["scoreboard"][0]["score"], len(QUESTIONS))
+
+    async def test_slow_connection_dropped_from_broadcast(self):
+        self.service.SEND_TIMEOUT = 0.01
+        slow = StubConnection(send_delay=1)
+        fast = StubConnection()
+        slow_player = self.service.join_room(self.room.room_id, "slow", slow)
+        self.service.join_room(self.room.room_id, "fast", fast)
+
+        await self.service.broadcast(self.room, {"type": "ping"})
+        self.assertIsNone(slow_player.connection)
+        self.assertEqual(slow.closed_with, 1008)
+        self.assertEqual(fast.sent, [{"type": "ping"}])
+        self.assertEqual(self.room.connections(), [fast])
+
+    async def test_no_flush_after_shutdown(self):
+        self.service.join_room(self.room.room_id, "alice", StubConnection())
+        self.service.shutdown()
+        self.service.mark_scoreboard_dirty(self.room)
+        self.assertIsNone(self.room.flush_task)
+
+
+if __name__ == "__main__":
+    unittest.main()